@@ -0,0 +1,69 @@
+import threading
+from collections import Counter
+
+class OverloadedError(Exception):
+    """Raised when a chat request cannot be admitted in time."""
+
+class AdmissionController:
+    """
+    Caps the number of chat requests doing LLM work at the same time.
+
+    Up to `max_in_flight` requests run at once, up to `max_queued` more wait at most
+    `queue_timeout` seconds for a free slot, everything beyond that is shed right away.
+    A request that timed out while its model call is still running can hand its slot to
+    that call with `release_when_done`, so stuck calls keep counting against capacity.
+    """
+
+    def __init__(self, max_in_flight: int = 4, max_queued: int = 8, queue_timeout: float = 5):
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queued = 0
+        self.counters = Counter()
+        self._slot_freed = threading.Condition()
+
+    def acquire(self, timeout: float = None):
+        """Take a slot, waiting in the queue up to `timeout` (default queue_timeout) seconds."""
+        wait = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        with self._slot_freed:
+            if self.in_flight >= self.max_in_flight:
+                if self.queued >= self.max_queued:
+                    self.counters['shed'] += 1
+                    raise OverloadedError("Too many requests in progress")
+                self.queued += 1
+                self.counters['queued'] += 1
+                try:
+                    admitted = self._slot_freed.wait_for(lambda: self.in_flight < self.max_in_flight, wait)
+                finally:
+                    self.queued -= 1
+                if not admitted:
+                    self.counters['shed'] += 1
+                    raise OverloadedError("Timed out waiting for a free slot")
+            self.in_flight += 1
+            self.counters['admitted'] += 1
+
+    def release(self, *_):
+        """Give a slot back, also usable as a future done callback."""
+        with self._slot_freed:
+            self.in_flight -= 1
+            self._slot_freed.notify()
+
+    def release_when_done(self, future):
+        """Keep the slot until `future` (an abandoned model call) finishes."""
+        future.add_done_callback(self.release)
+
+    def record(self, name: str):
+        """Count an outcome, e.g. 'completed', 'timeouts'."""
+        with self._slot_freed:
+            self.counters[name] += 1
+
+    def metrics(self) -> dict:
+        with self._slot_freed:
+            return {
+                'in_flight': self.in_flight,
+                'queued_now': self.queued,
+                'max_in_flight': self.max_in_flight,
+                'max_queued': self.max_queued,
+                **self.counters
+            }
@@ -1,21 +1,57 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response
 import uuid
+import json
+import time
+import threading
 import pandas as pd
 from datetime import datetime
-# # for patient data visualization
-# from patients_database import PatientAppointmentDB 
+# for patient data visualization
+from patients_database import patient
+from doctor_database import doc
+from change_feed import ChangeFeed
+from name_index import normalize_name
+from bulk_import import import_roster, import_appointments
 # Import your existing chatbot
-from chatbot import AppointBot  # Your existing chatbot class
+from chatbot import AppointBot, ChatTimeoutError, ChatHopLimitError  # Your existing chatbot class
+from admission import AdmissionController, OverloadedError
+from llm_config import load_chat_limits
 
 app = Flask(__name__)
 
 # Initialize the chatbot
-bot = AppointBot()
+limits = load_chat_limits()
+bot = AppointBot(max_hops=limits['max_hops'], max_llm_calls=limits['max_in_flight'])
+
+# Caps concurrent LLM work, extra chats queue briefly and are then shed with a 503
+admission = AdmissionController(max_in_flight=limits['max_in_flight'],
+                                max_queued=limits['max_queued'],
+                                queue_timeout=limits['queue_timeout'])
 
 
 # Simple in-memory storage for conversations (resets on server restart)
 conversations = {}
 
+# Booking/cancellation deltas pushed to open appointment pages
+feed = ChangeFeed()
+patient.subscribe(feed.publish)
+
+# Seconds between keep-alive comments on idle change streams, a closed page is only
+# noticed when a write fails, so keep this short to free its stream slot quickly
+STREAM_KEEPALIVE = 1
+# Each stream holds a server thread: close it after this many seconds (the browser
+# reconnects from its last version) and cap how many are open at once
+STREAM_MAX_AGE = 60
+MAX_STREAMS = limits['max_streams']
+# Seconds a new stream may wait for a slot to free up before it gets a 503
+STREAM_SLOT_WAIT = 3
+open_streams = {}  # stream id -> stop event
+streams_changed = threading.Condition()
+
+def release_stream(stream_id):
+    with streams_changed:
+        open_streams.pop(stream_id, None)
+        streams_changed.notify()
+
 @app.route('/')
 def index():
     """Main chat interface."""
@@ -32,8 +68,31 @@ def chat():
         if not user_message:
             return jsonify({'error': 'No message provided'}), 400
         
+        # The deadline starts now, time spent queued counts against it
+        deadline = time.monotonic() + limits['timeout']
+        try:
+            admission.acquire(timeout=limits['timeout'])
+        except OverloadedError:
+            return jsonify({'error': 'The assistant is busy right now, please try again in a moment.'}), 503, {'Retry-After': '5'}
+        
         # Get bot response
-        bot_response = bot.chat(user_message, conversation_id)
+        slot_handed_off = False
+        try:
+            bot_response = bot.chat(user_message, conversation_id, timeout=deadline - time.monotonic())
+            admission.record('completed')
+        except ChatTimeoutError as e:
+            admission.record('timeouts')
+            if e.pending is not None:
+                # The model call is still running, it keeps the slot until it finishes
+                admission.release_when_done(e.pending)
+                slot_handed_off = True
+            return jsonify({'error': 'The assistant took too long to answer, please try again.'}), 504
+        except ChatHopLimitError:
+            admission.record('hop_limit')
+            return jsonify({'error': 'The assistant could not finish this request, please rephrase it.'}), 500
+        finally:
+            if not slot_handed_off:
+                admission.release()
         
         # Store conversation (optional)
         if conversation_id not in conversations:
@@ -55,6 +114,12 @@ def chat():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/chat/metrics')
+def chat_metrics():
+    """Admission, timeout and shedding counters for /chat."""
+    return jsonify(admission.metrics())
+
+
 @app.route('/new_chat', methods=['POST'])
 def new_chat():
     """Start a new conversation."""
@@ -72,8 +137,11 @@ def new_chat():
 def view_appointments():
     """View all patient appointments."""
     try:
+        # Read the version first so the page can stream every change made after it
+        version = feed.version
+        
         # Get all appointments from the database
-        df = pd.read_csv("./data/patients.csv")
+        df = patient.appointments_df
         # Convert to DataFrame for easier handling
         if not df.empty:
             # df = pd.DataFrame(appointments)
@@ -85,13 +153,17 @@ def view_appointments():
         
         return render_template('appointments.html', 
                              appointments=appointments_data,
-                             total_count=len(appointments_data))
+                             total_count=len(appointments_data),
+                             stats=patient.stats.summary(),
+                             version=version)
     
     except Exception as e:
         return render_template('appointments.html', 
                              appointments=[], 
                              error=str(e),
-                             total_count=0)
+                             total_count=0,
+                             stats=None,
+                             version=feed.version)
     
 @app.route('/appointments/filter')
 def filter_appointments():
@@ -101,12 +173,15 @@ def filter_appointments():
         status = request.args.get('status', 'all')
         date = request.args.get('date', '')
         doctor = request.args.get('doctor', '')
+        version = feed.version
         
         # Get all appointments
-        df = pd.read_csv("./data/patients.csv")
+        df = patient.appointments_df
         
         if not df.empty:
-            # df = pd.DataFrame(appointments)
+            # Narrow down by doctor through the name index before the column filters
+            if doctor:
+                df = df.loc[sorted(patient.doctor_index.lookup(doctor))]
             
             # Apply filters
             if status != 'all':
@@ -115,9 +190,6 @@ def filter_appointments():
             if date:
                 df = df[df['appointment_date'] == date]
             
-            if doctor:
-                df = df[df['doctor_name'].str.contains(doctor, case=False, na=False)]
-            
             # Sort by appointment date
             df = df.sort_values('appointment_date', ascending=False)
             filtered_appointments = df.to_dict('records')
@@ -126,12 +198,120 @@ def filter_appointments():
         
         return jsonify({
             'appointments': filtered_appointments,
-            'count': len(filtered_appointments)
+            'count': len(filtered_appointments),
+            'version': version
         })
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/appointments/stats')
+def appointment_stats():
+    """Maintained appointment aggregates for the dashboard summary cards."""
+    try:
+        stats = patient.stats.summary()
+        stats['slot_utilization'] = doc.slot_utilization()
+        return jsonify(stats)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def matches_filters(appointment, status, date, doctor_names):
+    """Same filters as /appointments/filter, for a single pushed appointment."""
+    if status != 'all' and appointment['status'] != status:
+        return False
+    if date and appointment['appointment_date'] != date:
+        return False
+    if doctor_names is not None and normalize_name(appointment['doctor_name']) not in doctor_names:
+        return False
+    return True
+
+@app.route('/appointments/stream')
+def stream_appointments():
+    """Server-sent events with the appointment changes after a version cursor."""
+    try:
+        # EventSource resends the last seen id on reconnect
+        cursor = int(request.headers.get('Last-Event-ID') or request.args.get('since', 0))
+    except ValueError:
+        return jsonify({'error': 'Invalid version cursor'}), 400
+    
+    # The page's filters, each change is flagged with whether it belongs in the filtered list
+    status = request.args.get('status', 'all')
+    date = request.args.get('date', '')
+    doctor = request.args.get('doctor', '')
+    
+    # A page changing its filters hands over the slot of the stream it is replacing
+    replaces = request.args.get('replaces')
+    stream_id = uuid.uuid4().hex
+    stop = threading.Event()
+    with streams_changed:
+        if replaces in open_streams:
+            open_streams[replaces].set()
+            feed.wake()
+        if not streams_changed.wait_for(lambda: len(open_streams) < MAX_STREAMS, STREAM_SLOT_WAIT):
+            return jsonify({'error': 'Too many live update streams open'}), 503, {'Retry-After': '10'}
+        open_streams[stream_id] = stop
+    
+    def generate(cursor):
+        # Sent right away so the headers go out and the browser knows its reconnect delay
+        yield f"retry: 3000\nevent: stream\ndata: {json.dumps({'stream': stream_id})}\n\n"
+        closes_at = time.monotonic() + STREAM_MAX_AGE
+        while time.monotonic() < closes_at:
+            changes = feed.wait(cursor, timeout=min(STREAM_KEEPALIVE, closes_at - time.monotonic()), stop=stop)
+            if stop.is_set():
+                return
+            if changes is None:
+                # Cursor fell out of the change log, the page has to reload the list
+                cursor = feed.version
+                yield f"id: {cursor}\nevent: reset\ndata: {json.dumps({'version': cursor})}\n\n"
+                continue
+            if not changes:
+                yield ": keep-alive\n\n"
+                continue
+            if any(event == 'imported' for _, event, _ in changes):
+                # Bulk imports are not sent row by row, the page reloads the list once
+                cursor = changes[-1][0]
+                yield f"id: {cursor}\nevent: reset\ndata: {json.dumps({'version': cursor})}\n\n"
+                continue
+            # Doctor names matched through the same index as /appointments/filter
+            doctor_names = set(patient.doctor_index.search(doctor)) if doctor else None
+            for version, event, appointment in changes:
+                cursor = version
+                data = json.dumps({
+                    'version': version,
+                    'event': event,
+                    'appointment': appointment,
+                    'matches': matches_filters(appointment, status, date, doctor_names)
+                })
+                yield f"id: {version}\nevent: change\ndata: {data}\n\n"
+    
+    response = Response(generate(cursor), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(lambda: release_stream(stream_id))
+    return response
+
+@app.route('/import/<kind>', methods=['POST'])
+def bulk_import(kind):
+    """Bulk import a doctor roster or appointments from an uploaded CSV/JSONL file."""
+    try:
+        # Multipart upload in 'file', or the raw request body (CSV unless ?format=jsonl)
+        source = request.files.get('file') or request.stream
+        fmt = request.args.get('format')
+        
+        if kind == 'roster':
+            result = import_roster(source, doc, fmt)
+        elif kind == 'appointments':
+            result = import_appointments(source, patient, doc, fmt)
+        else:
+            return jsonify({'error': 'Unknown import type, use roster or appointments'}), 404
+        
+        return jsonify(result)
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 
 
 if __name__ == '__main__':
@@ -0,0 +1,108 @@
+import threading
+from collections import Counter
+
+class AppointmentStats:
+    """
+    Running aggregates over the appointments table.
+
+    The counters are built once from the existing rows and then updated from the
+    booking/cancellation events published by PatientAppointmentDB, so reading them
+    never has to scan the appointment history.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.by_status = Counter()
+        self.by_doctor = Counter()
+        self.by_specialty = Counter()
+        self.by_date = Counter()
+        self.cancelled_by_doctor = Counter()
+        self.cancelled_by_specialty = Counter()
+        # bookings/imports update the counters while the dashboard reads them
+        self._lock = threading.Lock()
+
+    def add_appointment(self, appointment: dict):
+        """Count one appointment row with its current status."""
+        with self._lock:
+            self._add(appointment)
+
+    def _add(self, appointment: dict):
+        self.total += 1
+        self.by_status[appointment['status']] += 1
+        self.by_doctor[appointment['doctor_name']] += 1
+        self.by_specialty[appointment['specialty']] += 1
+        self.by_date[str(appointment['appointment_date'])] += 1
+        if appointment['status'] == 'cancelled':
+            self.cancelled_by_doctor[appointment['doctor_name']] += 1
+            self.cancelled_by_specialty[appointment['specialty']] += 1
+
+    def add_batch(self, appointments):
+        """Count a DataFrame of appointment rows, e.g. one bulk import chunk, in one step."""
+        cancelled = appointments[appointments['status'] == 'cancelled']
+        with self._lock:
+            self.total += len(appointments)
+            self.by_status.update(appointments['status'].value_counts().to_dict())
+            self.by_doctor.update(appointments['doctor_name'].value_counts().to_dict())
+            self.by_specialty.update(appointments['specialty'].value_counts().to_dict())
+            self.by_date.update(appointments['appointment_date'].astype(str).value_counts().to_dict())
+            self.cancelled_by_doctor.update(cancelled['doctor_name'].value_counts().to_dict())
+            self.cancelled_by_specialty.update(cancelled['specialty'].value_counts().to_dict())
+
+    def change_status(self, appointment: dict, old_status: str, new_status: str):
+        """Move one appointment from `old_status` to `new_status`."""
+        if old_status == new_status:
+            return
+        with self._lock:
+            self._change_status(appointment, old_status, new_status)
+
+    def _change_status(self, appointment: dict, old_status: str, new_status: str):
+        self.by_status[old_status] -= 1
+        self.by_status[new_status] += 1
+        if new_status == 'cancelled':
+            self.cancelled_by_doctor[appointment['doctor_name']] += 1
+            self.cancelled_by_specialty[appointment['specialty']] += 1
+        elif old_status == 'cancelled':
+            self.cancelled_by_doctor[appointment['doctor_name']] -= 1
+            self.cancelled_by_specialty[appointment['specialty']] -= 1
+
+    def handle_event(self, event: str, appointment: dict):
+        """Listener for PatientAppointmentDB events."""
+        if event == 'booked':
+            self.add_appointment(appointment)
+        elif event == 'imported':
+            self.add_batch(appointment)
+        elif event == 'cancelled':
+            self.change_status(appointment, appointment['previous_status'], 'cancelled')
+
+    @staticmethod
+    def _rate(part: int, whole: int) -> float:
+        return round(part / whole, 4) if whole else 0.0
+
+    def summary(self) -> dict:
+        """JSON friendly snapshot of all aggregates."""
+        with self._lock:
+            return self._summary()
+
+    def _summary(self) -> dict:
+        return {
+            'total': self.total,
+            'by_status': dict(self.by_status),
+            'cancellation_rate': self._rate(self.by_status['cancelled'], self.total),
+            'by_doctor': {
+                name: {
+                    'bookings': count,
+                    'cancelled': self.cancelled_by_doctor[name],
+                    'cancellation_rate': self._rate(self.cancelled_by_doctor[name], count)
+                }
+                for name, count in self.by_doctor.items()
+            },
+            'by_specialty': {
+                name: {
+                    'bookings': count,
+                    'cancelled': self.cancelled_by_specialty[name],
+                    'cancellation_rate': self._rate(self.cancelled_by_specialty[name], count)
+                }
+                for name, count in self.by_specialty.items()
+            },
+            'by_date': dict(self.by_date),
+        }
@@ -0,0 +1,257 @@
+import argparse
+import time
+import pandas as pd
+
+# rows read, validated and committed per batch
+CHUNK_SIZE = 50_000
+# rejected rows reported back in detail, the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+ROSTER_COLUMNS = ['doctor_id', 'doctor_name', 'speciality', 'slot_timing']
+APPOINTMENT_COLUMNS = ['patient_name', 'patient_age', 'doctor_name', 'specialty', 'appointment_date', 'slot_timing']
+APPOINTMENT_STATUSES = {'confirmed', 'cancelled', 'completed'}
+SLOT_TIMING_PATTERN = r'^\d{2}:\d{2}-\d{2}:\d{2}$'
+
+def read_chunks(source, fmt: str = None, chunksize: int = CHUNK_SIZE):
+    """
+    Stream a CSV or JSONL file in DataFrame chunks.
+
+    Args:
+        source: file path or binary file object
+        fmt (str, optional): "csv" or "jsonl", guessed from the file name when not given
+        chunksize (int): rows per chunk
+    """
+    if fmt is None:
+        name = str(getattr(source, 'filename', None) or getattr(source, 'name', None) or source)
+        fmt = 'jsonl' if name.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+    if fmt == 'csv':
+        return pd.read_csv(source, chunksize=chunksize, dtype=str, keep_default_na=False)
+    if fmt == 'jsonl':
+        return pd.read_json(source, lines=True, chunksize=chunksize, dtype=False)
+    raise ValueError("format must be 'csv' or 'jsonl'")
+
+class ImportReport:
+    """Counts and the first rejected rows (numbered from 1, header excluded) of one import run."""
+
+    def __init__(self):
+        self.accepted = 0
+        self.rejected = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    def reject(self, rows: pd.DataFrame, reason: str, first_row: int):
+        self.rejected += len(rows)
+        for index in rows.index[:max(MAX_REPORTED_ERRORS - len(self.errors), 0)]:
+            self.errors.append({'row': int(index) + first_row + 1, 'error': reason})
+
+    def to_dict(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'errors': self.errors,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': int((self.accepted + self.rejected) / elapsed) if elapsed else 0
+        }
+
+def _missing_columns(chunk: pd.DataFrame, required: list):
+    return [column for column in required if column not in chunk.columns]
+
+def _keep(chunk, bad, reason, report, first_row):
+    """Reject the rows flagged in `bad` and return the others."""
+    if bad.any():
+        report.reject(chunk[bad], reason, first_row)
+    return chunk[~bad]
+
+def _slot_of_day(start_minutes: pd.Series) -> pd.Series:
+    slot = pd.Series('evening', index=start_minutes.index)
+    slot[start_minutes < 16 * 60] = 'afternoon'
+    slot[start_minutes < 12 * 60] = 'morning'
+    return slot
+
+def import_roster(source, doc_db, fmt: str = None, chunksize: int = CHUNK_SIZE) -> dict:
+    """
+    Import doctor slots from a CSV/JSONL roster into `doc_db`.
+
+    Rows need doctor_id (the slot id), doctor_name, speciality and slot_timing, slot
+    and is_booked are optional. Dates are not imported, new slots get an available date
+    the same way DocDB assigns them on load. Rows with an invalid value or a doctor_id
+    that is already taken are rejected, the rest are committed one chunk at a time.
+    """
+    report = ImportReport()
+    taken_ids = set(doc_db.df['doctor_id'])
+    first_row = 0
+
+    for chunk in read_chunks(source, fmt, chunksize):
+        chunk = chunk.reset_index(drop=True).fillna('')
+        missing = _missing_columns(chunk, ROSTER_COLUMNS)
+        if missing:
+            raise ValueError(f"roster is missing columns: {', '.join(missing)}")
+
+        for column in ['doctor_name', 'speciality']:
+            chunk[column] = chunk[column].astype(str).str.strip()
+            chunk = _keep(chunk, chunk[column] == '', f"{column} is required", report, first_row)
+
+        chunk['doctor_id'] = pd.to_numeric(chunk['doctor_id'], errors='coerce')
+        chunk = _keep(chunk, chunk['doctor_id'].isna(), "doctor_id must be a number", report, first_row)
+        chunk['doctor_id'] = chunk['doctor_id'].astype(int)
+
+        chunk['slot_timing'] = chunk['slot_timing'].astype(str).str.strip()
+        bad_timing = ~chunk['slot_timing'].str.match(SLOT_TIMING_PATTERN)
+        chunk = _keep(chunk, bad_timing, "slot_timing must look like HH:MM-HH:MM", report, first_row)
+
+        conflict = chunk['doctor_id'].isin(taken_ids) | chunk['doctor_id'].duplicated()
+        chunk = _keep(chunk, conflict, "doctor_id already exists", report, first_row)
+        taken_ids.update(chunk['doctor_id'])
+
+        if 'slot' not in chunk.columns:
+            start = chunk['slot_timing'].str.split('-').str[0].str.split(':', expand=True)
+            chunk['slot'] = _slot_of_day(start[0].astype(int) * 60 + start[1].astype(int)) if len(chunk) else ''
+        if 'is_booked' in chunk.columns:
+            chunk['is_booked'] = chunk['is_booked'].astype(str).str.lower().isin(['true', '1', 'yes'])
+        else:
+            chunk['is_booked'] = False
+
+        report.accepted += doc_db.add_slots(chunk)
+        first_row += chunksize
+
+    return report.to_dict()
+
+def _slot_tables(doc_db):
+    """DocDB slots by id, and slot ids by (lowercase doctor name, date, slot_timing)."""
+    slots = doc_db.df[['doctor_id', 'doctor_name', 'date', 'slot_timing']].copy()
+    slots['doctor_key'] = slots['doctor_name'].astype(str).str.strip().str.lower()
+    by_id = slots.set_index('doctor_id')
+    by_time = slots.drop_duplicates(['doctor_key', 'date', 'slot_timing']).set_index(
+        ['doctor_key', 'date', 'slot_timing'])['doctor_id']
+    return by_id, by_time
+
+def _match_slots(chunk, slots_by_id, slots_by_time, report, first_row):
+    """
+    Check rows that name a DocDB slot against it and find the slot for rows that don't.
+
+    Rows with a doctor_id must name a known slot with the same doctor, date and time.
+    Rows without one (doctor_id 0) get the id of the slot with their doctor, date and
+    time, if there is one, so they take part in the conflict check as well.
+    """
+    named = chunk['doctor_id'] != 0
+    unknown = named & ~chunk['doctor_id'].isin(slots_by_id.index)
+    chunk = _keep(chunk, unknown, "doctor_id is not a known doctor slot", report, first_row)
+    if chunk.empty:
+        return chunk
+
+    doctor_key = chunk['doctor_name'].str.lower()
+    named = chunk['doctor_id'] != 0
+    slot = slots_by_id.reindex(chunk['doctor_id'])
+    slot.index = chunk.index
+    mismatch = named & (
+        (slot['doctor_key'] != doctor_key) |
+        (slot['date'] != chunk['appointment_date']) |
+        (slot['slot_timing'] != chunk['slot_timing'])
+    )
+    chunk = _keep(chunk, mismatch, "doctor_name, appointment_date or slot_timing does not match doctor_id's slot",
+                  report, first_row)
+    if chunk.empty:
+        return chunk
+
+    keys = pd.MultiIndex.from_arrays([chunk['doctor_name'].str.lower(), chunk['appointment_date'], chunk['slot_timing']])
+    found = pd.Series(slots_by_time.reindex(keys).to_numpy(), index=chunk.index)
+    resolve = (chunk['doctor_id'] == 0) & found.notna()
+    chunk.loc[resolve, 'doctor_id'] = found[resolve].astype(int)
+    return chunk
+
+def import_appointments(source, patient_db, doc_db, fmt: str = None, chunksize: int = CHUNK_SIZE) -> dict:
+    """
+    Import appointments (e.g. a migration from another system) into `patient_db`.
+
+    Rows need the same fields as book_patient_appointment, status, booking_date,
+    symptoms and doctor_id (the DocDB slot id) are optional. A row is matched to its
+    `doc_db` slot by doctor_id, or by doctor, date and time when no id is given, see
+    _match_slots. Confirmed appointments book their slot, if it is already booked or
+    taken earlier in the same import the row is rejected. New appointment IDs are
+    assigned to every row.
+    """
+    report = ImportReport()
+    booked_slots = set(doc_db.df.loc[doc_db.df['is_booked'] == True, 'doctor_id'])
+    slots_by_id, slots_by_time = _slot_tables(doc_db)
+    first_row = 0
+
+    for chunk in read_chunks(source, fmt, chunksize):
+        chunk = chunk.reset_index(drop=True).fillna('')
+        missing = _missing_columns(chunk, APPOINTMENT_COLUMNS)
+        if missing:
+            raise ValueError(f"appointments are missing columns: {', '.join(missing)}")
+
+        for column in ['patient_name', 'doctor_name', 'specialty']:
+            chunk[column] = chunk[column].astype(str).str.strip()
+            chunk = _keep(chunk, chunk[column] == '', f"{column} is required", report, first_row)
+
+        chunk['patient_age'] = pd.to_numeric(chunk['patient_age'], errors='coerce')
+        bad_age = chunk['patient_age'].isna() | (chunk['patient_age'] < 0) | (chunk['patient_age'] > 150)
+        chunk = _keep(chunk, bad_age, "patient_age must be a number between 0 and 150", report, first_row)
+        chunk['patient_age'] = chunk['patient_age'].astype(int)
+
+        chunk['appointment_date'] = chunk['appointment_date'].astype(str).str.strip()
+        dates = pd.to_datetime(chunk['appointment_date'], format='%Y-%m-%d', errors='coerce')
+        chunk = _keep(chunk, dates.isna(), "appointment_date must be in YYYY-MM-DD format", report, first_row)
+
+        chunk['slot_timing'] = chunk['slot_timing'].astype(str).str.strip()
+        bad_timing = ~chunk['slot_timing'].str.match(SLOT_TIMING_PATTERN)
+        chunk = _keep(chunk, bad_timing, "slot_timing must look like HH:MM-HH:MM", report, first_row)
+
+        if 'status' in chunk.columns:
+            chunk['status'] = chunk['status'].astype(str).str.strip().str.lower().replace('', 'confirmed')
+            bad_status = ~chunk['status'].isin(APPOINTMENT_STATUSES)
+            chunk = _keep(chunk, bad_status, "status must be confirmed, cancelled or completed", report, first_row)
+        else:
+            chunk['status'] = 'confirmed'
+
+        if 'doctor_id' in chunk.columns:
+            chunk['doctor_id'] = pd.to_numeric(chunk['doctor_id'], errors='coerce').fillna(0).astype(int)
+        else:
+            chunk['doctor_id'] = 0
+
+        chunk = _match_slots(chunk, slots_by_id, slots_by_time, report, first_row)
+
+        # one pass over the slots this chunk wants to book
+        books_slot = (chunk['status'] == 'confirmed') & (chunk['doctor_id'] != 0)
+        conflict = books_slot & (
+            chunk['doctor_id'].isin(booked_slots) |
+            chunk['doctor_id'].where(books_slot).duplicated()
+        )
+        chunk = _keep(chunk, conflict, "doctor slot is already booked", report, first_row)
+        new_slots = chunk.loc[books_slot[~conflict], 'doctor_id']
+        booked_slots.update(new_slots)
+        doc_db.mark_booked(new_slots)
+
+        if 'booking_date' not in chunk.columns:
+            chunk['booking_date'] = pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+        if 'symptoms' not in chunk.columns:
+            chunk['symptoms'] = ''
+
+        report.accepted += patient_db.add_appointments(chunk)
+        first_row += chunksize
+
+    return report.to_dict()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import doctor rosters or appointments from CSV/JSONL")
+    parser.add_argument("kind", choices=["roster", "appointments"])
+    parser.add_argument("file")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default=None)
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    from doctor_database import doc
+    if args.kind == "roster":
+        result = import_roster(args.file, doc, args.format, args.chunksize)
+    else:
+        from patients_database import patient
+        result = import_appointments(args.file, patient, doc, args.format, args.chunksize)
+
+    print(f"accepted {result['accepted']}, rejected {result['rejected']} "
+          f"in {result['seconds']}s ({result['rows_per_second']} rows/s)")
+    for error in result['errors']:
+        print(f"  row {error['row']}: {error['error']}")
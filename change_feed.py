@@ -0,0 +1,72 @@
+import math
+import threading
+from collections import deque
+from itertools import islice
+
+def _jsonable(appointment: dict) -> dict:
+    """Turn numpy scalars into Python values and NaN into None."""
+    clean = {}
+    for key, value in appointment.items():
+        if hasattr(value, 'item'):
+            value = value.item()
+        if isinstance(value, float) and math.isnan(value):
+            value = None
+        clean[key] = value
+    return clean
+
+class ChangeFeed:
+    """
+    Versioned log of the latest appointment changes.
+
+    Subscribed to PatientAppointmentDB, every booking/cancellation gets the next version
+    number. Clients keep the last version they have seen and ask only for the changes
+    after it. Only the most recent `max_events` changes are kept, a client whose cursor
+    is older than that has to reload the full list.
+    """
+
+    def __init__(self, max_events: int = 1000):
+        self.version = 0
+        self._events = deque(maxlen=max_events)  # (version, event, appointment)
+        self._changed = threading.Condition()
+
+    def publish(self, event: str, appointment):
+        """Listener for PatientAppointmentDB events, an 'imported' batch is logged as one change."""
+        if event == 'imported':
+            payload = {'count': len(appointment)}
+        else:
+            payload = _jsonable(appointment)
+        with self._changed:
+            self.version += 1
+            self._events.append((self.version, event, payload))
+            self._changed.notify_all()
+
+    def since(self, version: int):
+        """
+        Get the changes after `version`.
+
+        Returns:
+            list: (version, event, appointment) tuples, oldest first, or None when the
+                  cursor is no longer covered by the log (or comes from another server run)
+        """
+        with self._changed:
+            if version == self.version:
+                return []
+            oldest = self._events[0][0] if self._events else self.version + 1
+            if version > self.version or version < oldest - 1:
+                return None
+            return list(islice(self._events, version - oldest + 1, None))
+
+    def wait(self, version: int, timeout: float = None, stop=None):
+        """
+        Like `since`, but blocks up to `timeout` seconds for a change after `version`.
+
+        Returns early with no changes once the `stop` event is set and `wake` is called.
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version or (stop is not None and stop.is_set()), timeout)
+            return self.since(version)
+
+    def wake(self):
+        """Wake every waiting reader so it can check its stop event."""
+        with self._changed:
+            self._changed.notify_all()
@@ -1,8 +1,12 @@
 
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from langchain_community.chat_models import ChatOllama
 from langgraph.graph import StateGraph, MessagesState, START
 from langgraph.prebuilt import ToolNode
 from langgraph.checkpoint.memory import MemorySaver
+from langgraph.errors import GraphRecursionError
+from langchain_core.runnables import RunnableConfig
 from langchain_core.messages import SystemMessage
 from langchain_core.messages import HumanMessage
 from doctor_database import TOOLS
@@ -10,18 +14,32 @@ from patients_database import PATIENTS_TOOL
 
 from llm_config import load_llm
 
+class ChatTimeoutError(Exception):
+    """Raised when a chat request runs past its deadline."""
+
+    def __init__(self, message, pending=None):
+        super().__init__(message)
+        # model call that was still running when the deadline passed
+        self.pending = pending
+
+class ChatHopLimitError(Exception):
+    """Raised when the agent and tools call each other more often than allowed."""
+
 class AppointBot:
-    def __init__(self):
+    def __init__(self, max_hops: int = 8, max_llm_calls: int = 4):
         """Initialize the chatbot with improved architecture."""
         self.llm = load_llm() #load the LLM
         self.tools = TOOLS + PATIENTS_TOOL
         self.memory = MemorySaver()
+        self.max_hops = max_hops
+        # model calls with a deadline run here, so a request can stop waiting on a stuck call
+        self.llm_pool = ThreadPoolExecutor(max_workers=max_llm_calls, thread_name_prefix="llm")
         self.graph = self._create_graph()
         
     def _create_graph(self):
         """Create the LangGraph workflow with memory management."""
         
-        def agent(state: MessagesState):
+        def agent(state: MessagesState, config: RunnableConfig):
             """Enhanced agent with medical appointment context."""
             messages = state["messages"]
             
@@ -34,9 +52,16 @@ class AppointBot:
                 system_message = SystemMessage(content=system_prompt)
                 messages = [system_message] + messages
             
-            # Bind tools and get response
-            model_with_tools = self.llm.bind_tools(self.tools)
-            response = model_with_tools.invoke(messages)
+            # Bind tools and get response, after max_hops tool rounds the model has to answer without them
+            if self._tool_rounds(messages) >= self.max_hops:
+                model = self.llm
+            else:
+                model = self.llm.bind_tools(self.tools)
+            deadline = config.get("configurable", {}).get("deadline")
+            if deadline is None:
+                response = model.invoke(messages)
+            else:
+                response = self._invoke_before(deadline, model, messages)
             
             return {"messages": [response]}
         
@@ -59,6 +84,28 @@ class AppointBot:
         # Compile with memory persistence
         return workflow.compile(checkpointer=self.memory)
     
+    def _tool_rounds(self, messages):
+        """Count the agent -> tools rounds since the user's last message."""
+        rounds = 0
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                break
+            if getattr(message, 'tool_calls', None):
+                rounds += 1
+        return rounds
+    
+    def _invoke_before(self, deadline: float, model, messages):
+        """Invoke the model, giving up when the monotonic `deadline` passes."""
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise ChatTimeoutError("Chat request ran out of time")
+        
+        future = self.llm_pool.submit(model.invoke, messages)
+        try:
+            return future.result(timeout=remaining)
+        except FutureTimeoutError:
+            raise ChatTimeoutError("Model did not answer before the deadline", pending=future)
+    
     def _get_medical_system_prompt(self):
         """Get comprehensive medical appointment system prompt."""
         return """You are a comprehensive medical appointment booking assistant.
@@ -86,16 +133,17 @@ class AppointBot:
                 AVAILABLE TOOLS:
                 Doctor Management:
                 - get_doctors_by_specialty: Find doctors by medical specialty
+                - recommend_slots: Get the top few best slots for a specialty (use the patient's preferred morning/afternoon/evening if they gave one)
                 - check_doctor_availability: Check specific doctor availability
 
                 Patient Appointment Management:
                 - book_patient_appointment: Book appointment with patient details (only execute this when you have all the details realted to patient and doctor)
-                - get_patient_appointments: View patient's appointment history
+                - get_patient_appointments: View patient's appointment history (needs the exact name, if it suggests similar names ask the user which one is theirs before looking it up again)
                 - cancel_appointment: Cancel appointments by ID
 
                 BOOKING WORKFLOW:
                 1. User mentions symptoms → Find appropriate specialty
-                2. Use get_doctors_by_specialty to show available doctors
+                2. Use recommend_slots (or get_doctors_by_specialty for the full list) to show available doctors
                 3. When user selects doctor → Ask for patient name and age
                 4. Use book_patient_appointment to complete booking
                 5. Confirm appointment details
@@ -128,17 +176,36 @@ class AppointBot:
             return "medical appointment booking assistant" in messages[0].content
         return False
     
-    def chat(self, message: str, thread_id: str = "default"):
-        """Chat with automatic memory management."""
+    def chat(self, message: str, thread_id: str = "default", timeout: float = None):
+        """
+        Chat with automatic memory management.
+
+        Args:
+            message (str): The user's message
+            thread_id (str): Conversation id used for the memory
+            timeout (float, optional): Seconds the whole request may take
+
+        Raises:
+            ChatTimeoutError: If the deadline passes before the answer is ready
+            ChatHopLimitError: If the agent/tools loop still runs past the graph step limit
+        """
         
-        
-        config = {"configurable": {"thread_id": thread_id}}
+        config = {
+            "configurable": {"thread_id": thread_id},
+            # backstop: every agent -> tools round is two graph steps, plus the final answer
+            "recursion_limit": 2 * self.max_hops + 2
+        }
+        if timeout is not None:
+            config["configurable"]["deadline"] = time.monotonic() + timeout
         
         # Invoke graph with memory
-        response = self.graph.invoke(
-            {"messages": [HumanMessage(content=message)]},
-            config=config
-        )
+        try:
+            response = self.graph.invoke(
+                {"messages": [HumanMessage(content=message)]},
+                config=config
+            )
+        except GraphRecursionError:
+            raise ChatHopLimitError(f"Stopped after {self.max_hops} agent/tool rounds")
         
         return response["messages"][-1].content
 
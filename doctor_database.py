@@ -1,21 +1,75 @@
+import threading
 import pandas as pd
 import numpy as np
 from langchain.tools import tool
 from datetime import datetime, timedelta
 
-def add_date(df):
+def add_date(df, seed=42):
     today = datetime.now().date()
-    np.random.seed(42)  # Optional: for reproducible results
+    if seed is not None:
+        np.random.seed(seed)  # Optional: for reproducible results
     random_days = np.random.choice([0, 1, 2], size=len(df))
     df['date'] = [(today + timedelta(days=int(day))).strftime('%Y-%m-%d') for day in random_days]
 
+def add_start_minutes(df):
+    # minutes since midnight of the slot start, "08:00-08:30" -> 480
+    start = df['slot_timing'].astype(str).str.split('-').str[0].str.split(':', expand=True)
+    df['start_minutes'] = start[0].astype(int) * 60 + start[1].astype(int)
+
+# weights used by recommend_slots, lower score ranks first
+RANKING_WEIGHTS = {
+    "earliest": {"time": 1.0, "load": 0.0, "preference": 1.0},
+    "balanced": {"time": 0.5, "load": 1.0, "preference": 1.0},
+    "least_busy": {"time": 0.1, "load": 1.0, "preference": 0.5},
+}
+
+# columns kept in the data file, date and start_minutes are derived on load
+SLOT_COLUMNS = ['doctor_id', 'doctor_name', 'speciality', 'slot', 'slot_timing', 'is_booked']
+
 class DocDB:
     def __init__(self,data_file="./data/doctor.csv"):
+        self.data_file = data_file
         self.df = pd.read_csv(data_file)
         add_date(self.df) #adds the date available
+        add_start_minutes(self.df)
+
+        # per doctor load counters, kept up to date on every booking
+        self.doctor_total_slots = self.df.groupby('doctor_name').size().to_dict()
+        self.doctor_booked_slots = (
+            self.df[self.df['is_booked'] == True].groupby('doctor_name').size().to_dict()
+        )
+        # bookings/imports update the slots and counters while the dashboard reads them
+        self._lock = threading.Lock()
 
         # self.history = []
 
+    def _doctor_utilization(self, doctor_name: str) -> float:
+        """Fraction of a doctor's slots that are already booked."""
+        with self._lock:
+            return self._utilization(doctor_name)
+
+    def _utilization(self, doctor_name: str) -> float:
+        total = self.doctor_total_slots.get(doctor_name, 0)
+        if total == 0:
+            return 0.0
+        return self.doctor_booked_slots.get(doctor_name, 0) / total
+
+    # not exported as a tool, used by the appointments dashboard
+    def slot_utilization(self):
+        """Booked/total slot counts overall and per doctor, from the load counters."""
+        with self._lock:
+            total = sum(self.doctor_total_slots.values())
+            booked = sum(self.doctor_booked_slots.values())
+            return {
+                'total_slots': total,
+                'booked_slots': booked,
+                'utilization': round(booked / total, 4) if total else 0.0,
+                'by_doctor': {
+                    name: round(self._utilization(name), 4)
+                    for name in self.doctor_total_slots
+                }
+            }
+
     def get_doctors_by_specialty(self, specialty: str):
         """
         Retrieve all doctors who specialize in a specific medical field.
@@ -52,6 +106,82 @@ class DocDB:
 
         return doctors_list
 
+    def recommend_slots(self, specialty: str, preferred_slot: str = None, top_k: int = 3, strategy: str = "balanced"):
+        """
+        Recommend the best available appointment slots for a medical specialty.
+
+        Use this instead of get_doctors_by_specialty when the patient just wants a good
+        slot, it only returns the top few options. Slots are ranked by how soon they are,
+        how busy the doctor already is (so bookings are spread across doctors) and whether
+        they match the patient's preferred part of the day. Slots that already started are
+        left out.
+
+        Args:
+            specialty (str): The medical specialty to search for.
+            preferred_slot (str, optional): Preferred part of the day, one of
+                                    "morning", "afternoon" or "evening".
+            top_k (int, optional): Number of slots to return (default 3).
+            strategy (str, optional): Ranking strategy, one of "earliest" (soonest slot first),
+                                    "balanced" (soon and least busy doctor) or
+                                    "least_busy" (least busy doctor first). Default "balanced".
+
+        Returns:
+            list: A list of dictionaries ordered best first. Each dictionary includes the following keys:
+                - doctor_id (str): Unique identifier for the doctor
+                - doctor_name (str): Full name of the doctor
+                - date (str): Date available for appointment
+                - slot (str): Part of the day (morning/afternoon/evening)
+                - slot_timing (str): Time of the slot
+                - utilization (float): Fraction of the doctor's slots already booked
+        """
+        weights = RANKING_WEIGHTS.get(strategy, RANKING_WEIGHTS["balanced"])
+
+        candidates = self.df[
+            (self.df['speciality'].str.lower() == specialty.lower()) &
+            (self.df['is_booked'] == False)
+        ]
+        if candidates.empty:
+            return []
+
+        # minutes from now until the slot starts, slots that already started are dropped
+        starts = pd.to_datetime(candidates['date']) + pd.to_timedelta(candidates['start_minutes'], unit='m')
+        wait = (starts - pd.Timestamp.now()).dt.total_seconds() / 60
+        upcoming = wait >= 0
+        candidates, wait = candidates[upcoming], wait[upcoming]
+        if candidates.empty:
+            return []
+
+        # scaled to 0..1 over the candidates
+        wait_range = wait.max() - wait.min()
+        time_score = (wait - wait.min()) / wait_range if wait_range else wait * 0
+
+        load_score = candidates['doctor_name'].map(self._doctor_utilization)
+
+        if preferred_slot:
+            preference_score = (candidates['slot'].str.lower() != preferred_slot.lower()).astype(float)
+        else:
+            preference_score = 0.0
+
+        score = (
+            weights["time"] * time_score +
+            weights["load"] * load_score +
+            weights["preference"] * preference_score
+        )
+        best = candidates.assign(_score=score, _wait=wait).sort_values(['_score', '_wait']).head(max(int(top_k), 1))
+
+        recommendations = []
+        for _, row in best.iterrows():
+            recommendations.append({
+                'doctor_id': str(row.get('doctor_id', '')),
+                'doctor_name': row.get('doctor_name', ''),
+                'date': row.get('date', ''),
+                'slot': row.get('slot', ''),
+                'slot_timing': row.get('slot_timing', ''),
+                'utilization': round(self._doctor_utilization(row.get('doctor_name', '')), 2)
+            })
+
+        return recommendations
+
     def book_doctor_appointment(self, doctor_id: int):
         """
         Books the slot with the doctor having the doctor id.
@@ -70,19 +200,22 @@ class DocDB:
                 - slot_timing (str): Days when doctor is available
         """        
 
-        mask_available = (
-            (self.df['doctor_id'] == doctor_id) &
-            (self.df['is_booked'] == False)
-        )
+        with self._lock:
+            mask_available = (
+                (self.df['doctor_id'] == doctor_id) &
+                (self.df['is_booked'] == False)
+            )
 
-        if not mask_available.any():
-            # Either ID not found or slot already booked
-            return []
-        
-        # 2️⃣ mark the slot as booked
-        self.df.loc[mask_available, 'is_booked'] = True
+            if not mask_available.any():
+                # Either ID not found or slot already booked
+                return []
 
-        booked_row = self.df[self.df['doctor_id'] == doctor_id]
+            # 2️⃣ mark the slot as booked
+            self.df.loc[mask_available, 'is_booked'] = True
+            for name in self.df.loc[mask_available, 'doctor_name']:
+                self.doctor_booked_slots[name] = self.doctor_booked_slots.get(name, 0) + 1
+
+            booked_row = self.df[self.df['doctor_id'] == doctor_id]
         booked_info = {
             'doctor_id'  : str(booked_row.get('doctor_id', '')),
             'doctor_name': booked_row.get('doctor_name', ''),
@@ -92,6 +225,57 @@ class DocDB:
 
         return booked_info
 
+    # bulk import helpers, not exported as tools
+    def add_slots(self, slots):
+        """
+        Add a batch of already validated doctor slots and append them to the data file.
+
+        Like the slots loaded from the data file, the new slots get a random available
+        date, any date column in `slots` is ignored.
+
+        Args:
+            slots (pd.DataFrame): rows with doctor_id, doctor_name, speciality, slot,
+                                  slot_timing and is_booked
+
+        Returns:
+            int: number of slots added
+        """
+        if slots.empty:
+            return 0
+
+        slots = slots.copy()
+        # no reseed, so every imported chunk does not repeat the same dates
+        add_date(slots, seed=None)
+        add_start_minutes(slots)
+        with self._lock:
+            slots[SLOT_COLUMNS].to_csv(self.data_file, mode='a', header=False, index=False)
+            self.df = pd.concat([self.df, slots[self.df.columns]], ignore_index=True)
+
+            for name, count in slots.groupby('doctor_name').size().items():
+                self.doctor_total_slots[name] = self.doctor_total_slots.get(name, 0) + int(count)
+            for name, count in slots[slots['is_booked'] == True].groupby('doctor_name').size().items():
+                self.doctor_booked_slots[name] = self.doctor_booked_slots.get(name, 0) + int(count)
+
+        return len(slots)
+
+    def mark_booked(self, doctor_ids):
+        """
+        Mark a batch of slots as booked in one pass and save them to the data file, so a
+        later import (or server start) does not see them as free again.
+
+        Returns:
+            int: how many of the slots were free before
+        """
+        with self._lock:
+            mask = self.df['doctor_id'].isin(doctor_ids) & (self.df['is_booked'] == False)
+            if not mask.any():
+                return 0
+            for name, count in self.df.loc[mask, 'doctor_name'].value_counts().items():
+                self.doctor_booked_slots[name] = self.doctor_booked_slots.get(name, 0) + int(count)
+            self.df.loc[mask, 'is_booked'] = True
+            self.df[SLOT_COLUMNS].to_csv(self.data_file, index=False)
+            return int(mask.sum())
+
     def check_doctor_availability(self, doctor_id: int = None, specialty: str = None, date: str = None, slot_timing: str = None):
         """
         Check availability of doctors based on various filter criteria.
@@ -220,6 +404,7 @@ class DocDB:
 doc = DocDB()
 TOOLS = [
     doc.get_doctors_by_specialty,
+    doc.recommend_slots,
     doc.book_doctor_appointment,
     doc.check_doctor_availability
 ]
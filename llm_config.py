@@ -22,4 +22,15 @@ def load_llm():
     else:
         print("no service is showing up...... chat llm_config and .env")
 
+def load_chat_limits():
+    """Deadline, hop cap and admission limits for /chat and the live update stream cap, all optional in the .env file."""
+    load_dotenv()
 
+    return {
+        'timeout': float(os.getenv("CHAT_TIMEOUT", 60)),
+        'max_hops': int(os.getenv("CHAT_MAX_HOPS", 8)),
+        'max_in_flight': int(os.getenv("CHAT_MAX_IN_FLIGHT", 4)),
+        'max_queued': int(os.getenv("CHAT_MAX_QUEUED", 8)),
+        'queue_timeout': float(os.getenv("CHAT_QUEUE_TIMEOUT", 5)),
+        'max_streams': int(os.getenv("APPOINTMENTS_MAX_STREAMS", 4)),
+    }
@@ -0,0 +1,161 @@
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+def normalize_name(name) -> str:
+    """
+    Lowercase a name and strip punctuation, "Dr. Evans" -> "dr evans".
+
+    Letters, digits and combining marks of any script are kept, so "José Núñez" and
+    "राज शर्मा" keep their tokens (Python's \\w would split Devanagari vowel signs off).
+    """
+    text = unicodedata.normalize("NFC", str(name)).casefold()
+    kept = [c if unicodedata.category(c)[0] in "LNM" else " " for c in text]
+    return " ".join("".join(kept).split())
+
+def _trigrams(token: str) -> set:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _edit_distance(a: str, b: str) -> int:
+    """Edit distance counting a swap of two neighbouring letters as one typo."""
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        prev2, prev = prev, cur
+    return prev[-1]
+
+class NameIndex:
+    """
+    In-memory index from person names to row keys.
+
+    Names are normalized and split into tokens. Every query token can match a name token
+    exactly, as a prefix ("eva" -> "evans") or with a small number of typos
+    ("evnas" -> "evans"), and a name matches when all query tokens match. The index is
+    built over distinct names, so lookups do not depend on how many rows share a name.
+    """
+
+    def __init__(self):
+        self._keys = defaultdict(set)            # normalized name -> row keys
+        self._token_names = defaultdict(set)     # token -> normalized names
+        self._trigram_tokens = defaultdict(set)  # trigram -> tokens
+        self._sorted_tokens = []                 # all tokens, sorted for prefix lookup
+        # bookings/imports add names while requests search them
+        self._lock = threading.Lock()
+
+    def add(self, name, key):
+        """Index the row `key` under `name`."""
+        normalized = normalize_name(name)
+        if not normalized:
+            return
+        with self._lock:
+            self._add(normalized, key)
+
+    def _add(self, normalized: str, key):
+        self._keys[normalized].add(key)
+        for token in normalized.split():
+            if token not in self._token_names:
+                insort(self._sorted_tokens, token)
+                for gram in _trigrams(token):
+                    self._trigram_tokens[gram].add(token)
+            self._token_names[token].add(normalized)
+
+    def _match_token(self, query_token: str) -> dict:
+        """Score the indexed tokens matching one query token (1.0 exact, 0.9 prefix, lower for typos).
+
+        Typo matching only runs when nothing matches exactly or as a prefix.
+        """
+        matches = {}
+        if query_token in self._token_names:
+            matches[query_token] = 1.0
+
+        i = bisect_left(self._sorted_tokens, query_token)
+        while i < len(self._sorted_tokens) and self._sorted_tokens[i].startswith(query_token):
+            matches.setdefault(self._sorted_tokens[i], 0.9)
+            i += 1
+
+        if not matches and len(query_token) >= 3:
+            max_typos = 1 if len(query_token) <= 5 else 2
+            candidates = set()
+            for gram in _trigrams(query_token):
+                candidates |= self._trigram_tokens.get(gram, set())
+            for token in candidates:
+                if abs(len(token) - len(query_token)) > max_typos:
+                    continue
+                distance = _edit_distance(query_token, token)
+                if distance <= max_typos:
+                    matches[token] = 0.8 - 0.1 * distance
+        return matches
+
+    def search(self, query: str, limit: int = None) -> list:
+        """Return the normalized names matching `query`, best match first."""
+        with self._lock:
+            return self._search(query, limit)
+
+    def _search(self, query: str, limit: int = None) -> list:
+        query_tokens = normalize_name(query).split()
+        if not query_tokens:
+            return []
+
+        scores = None
+        for query_token in query_tokens:
+            token_scores = defaultdict(float)
+            for token, score in self._match_token(query_token).items():
+                for name in self._token_names[token]:
+                    token_scores[name] = max(token_scores[name], score)
+            if scores is None:
+                scores = dict(token_scores)
+            else:
+                scores = {name: scores[name] + s for name, s in token_scores.items() if name in scores}
+            if not scores:
+                return []
+
+        ranked = sorted(scores, key=lambda name: (-scores[name], abs(len(name.split()) - len(query_tokens)), name))
+        return ranked[:limit] if limit else ranked
+
+    def lookup(self, query: str) -> set:
+        """Return the row keys of every name matching `query`."""
+        keys = set()
+        with self._lock:
+            for name in self._search(query):
+                keys |= self._keys[name]
+        return keys
+
+    def keys_for(self, normalized_name: str) -> set:
+        """Return the row keys indexed under an already normalized name."""
+        with self._lock:
+            return set(self._keys.get(normalized_name, set()))
+
+
+if __name__ == "__main__":
+    # lookup latency over 1M synthetic appointments
+    import random
+    import time
+    random.seed(42)
+    first = ["".join(random.choices("abcdefghijklmnopqrstuvwxyz", k=random.randint(4, 8))) for _ in range(2000)]
+    last = ["".join(random.choices("abcdefghijklmnopqrstuvwxyz", k=random.randint(5, 9))) for _ in range(2000)]
+    patients = [f"{random.choice(first)} {random.choice(last)}" for _ in range(50000)]
+
+    index = NameIndex()
+    start = time.perf_counter()
+    for row in range(1_000_000):
+        index.add(patients[row % len(patients)], row)
+    print(f"built index over 1,000,000 appointments in {time.perf_counter() - start:.2f}s")
+
+    sample = random.sample(patients, 200)
+    queries = {
+        "exact": sample,
+        "prefix": [name.split()[0][:3] + " " + name.split()[1][:4] for name in sample],
+        "typo": [name[:2] + name[3] + name[2] + name[4:] for name in sample],
+    }
+    for kind, names in queries.items():
+        start = time.perf_counter()
+        for name in names:
+            index.lookup(name)
+        print(f"{kind:>6} lookup: {(time.perf_counter() - start) / len(names) * 1000:.3f} ms avg")
@@ -1,7 +1,11 @@
+import os
+import threading
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
+from name_index import NameIndex, normalize_name
+from appointment_stats import AppointmentStats
 
 class PatientAppointmentDB:
     def __init__(self, appointments_file="./data/patients.csv"):
@@ -20,6 +24,22 @@ class PatientAppointmentDB:
             ])
         
         self.next_appointment_id = self._get_next_appointment_id()
+        # chat bookings, cancellations and bulk imports replace appointments_df and write
+        # the CSV file, one writer at a time so none of them drops the others' rows
+        self._write_lock = threading.Lock()
+
+        # name indexes over the appointment rows, keyed by DataFrame index label
+        self.patient_index = NameIndex()
+        self.doctor_index = NameIndex()
+        df = self.appointments_df
+        for key, patient_name, doctor_name in zip(df.index, df['patient_name'], df['doctor_name']):
+            self.patient_index.add(patient_name, key)
+            self.doctor_index.add(doctor_name, key)
+
+        # running aggregates, kept current through the booking/cancellation events
+        self.stats = AppointmentStats()
+        self.stats.add_batch(df)
+        self._listeners = [self.stats.handle_event]
 
     def _get_next_appointment_id(self) -> int:
         """Get next available appointment ID."""
@@ -27,6 +47,19 @@ class PatientAppointmentDB:
             return 1
         return self.appointments_df['appointment_id'].max() + 1
     
+    def subscribe(self, listener):
+        """
+        Register `listener(event, appointment)` to be called on every change.
+
+        Events are 'booked' and 'cancelled' with the appointment dict, and 'imported' with
+        a DataFrame of the rows added by a bulk import.
+        """
+        self._listeners.append(listener)
+
+    def _publish(self, event: str, appointment: dict):
+        for listener in self._listeners:
+            listener(event, appointment)
+
     def book_patient_appointment(self, patient_name: str, patient_age: int, 
                         doctor_name: str, specialty: str, 
                            appointment_date: str, slot_timing: str, doctor_id: int = 0,symptoms: str = ""):
@@ -47,6 +80,15 @@ class PatientAppointmentDB:
         Returns:
             dict: Booking confirmation details including all appointment info
         """
+        with self._write_lock:
+            new_appointment = self._book(patient_name, patient_age, doctor_name, specialty,
+                                         appointment_date, slot_timing, doctor_id, symptoms)
+
+        print(f"New appointment reached for patient {patient_name}, and age {patient_age}, doctor : {doctor_name} with id {doctor_id}")
+
+        return new_appointment
+
+    def _book(self, patient_name, patient_age, doctor_name, specialty, appointment_date, slot_timing, doctor_id, symptoms):
         # Create appointment record
         appointment_id = self.next_appointment_id
         self.next_appointment_id += 1
@@ -70,26 +112,81 @@ class PatientAppointmentDB:
             self.appointments_df, 
             pd.DataFrame([new_appointment])
         ], ignore_index=True)
+        row_key = self.appointments_df.index[-1]
+        self.patient_index.add(patient_name, row_key)
+        self.doctor_index.add(doctor_name, row_key)
 
-        self.save_to_csv()
-        
-        print(f"New appointment reached for patient {patient_name}, and age {patient_age}, doctor : {doctor_name} with id {doctor_id}")
+        self._save_to_csv()
+        self._publish('booked', new_appointment)
 
         return new_appointment
 
+    def add_appointments(self, appointments: pd.DataFrame, filename: str = "./data/patients.csv"):
+        """
+        Add a batch of already validated appointments, used by bulk imports.
+
+        Fresh appointment IDs are assigned, the batch is appended to the CSV file in one
+        write and a single 'imported' event carrying the batch DataFrame is published.
+
+        Args:
+            appointments (pd.DataFrame): rows with the appointment columns, except appointment_id
+            filename (str): CSV file to append the batch to
+
+        Returns:
+            int: number of appointments added
+        """
+        if appointments.empty:
+            return 0
+
+        with self._write_lock:
+            return self._add_batch(appointments, filename)
+
+    def _add_batch(self, appointments: pd.DataFrame, filename: str):
+        batch = appointments.copy()
+        batch['appointment_id'] = np.arange(self.next_appointment_id, self.next_appointment_id + len(batch))
+        self.next_appointment_id += len(batch)
+        batch = batch[self.appointments_df.columns]
+
+        batch.to_csv(filename, mode='a', header=not os.path.exists(filename), index=False)
+
+        start = len(self.appointments_df)
+        self.appointments_df = pd.concat([self.appointments_df, batch], ignore_index=True)
+        for key, patient_name, doctor_name in zip(range(start, len(self.appointments_df)),
+                                                  batch['patient_name'], batch['doctor_name']):
+            self.patient_index.add(patient_name, key)
+            self.doctor_index.add(doctor_name, key)
+
+        self._publish('imported', batch)
+
+        return len(batch)
+
     def get_patient_appointments(self, patient_name: str):
         """
         Get all appointments for a specific patient.
+
+        Appointments are only returned for an exact name match (case and punctuation are
+        ignored). If there is no exact match, similarly spelled patient names are returned
+        instead, without any appointment details. Confirm the right name with the user and
+        call this again with it.
         
         Args:
             patient_name (str): Name of the patient to search for
         
         Returns:
-            list: List of appointments for the patient
+            list: List of appointments for the patient, or when the name has no exact match a
+                dictionary with:
+                - status (str): 'not_found'
+                - message (str): Human-readable explanation
+                - did_you_mean (list): Similar patient names, may be empty
         """
-        patient_appointments = self.appointments_df[
-            self.appointments_df['patient_name'].str.lower() == patient_name.lower()
-        ]
+        keys = self.patient_index.keys_for(normalize_name(patient_name))
+        if not keys:
+            return {
+                'status': 'not_found',
+                'message': 'No patient with exactly this name, confirm the name with the user before looking it up again',
+                'did_you_mean': self.patient_index.search(patient_name, limit=5)
+            }
+        patient_appointments = self.appointments_df.loc[sorted(keys)]
         
         appointments_list = []
         for _, row in patient_appointments.iterrows():
@@ -170,6 +267,10 @@ class PatientAppointmentDB:
                 - This function does not automatically notify patients of cancellation
         """
 
+        with self._write_lock:
+            return self._cancel(appointment_id)
+
+    def _cancel(self, appointment_id: int):
         appointment_mask = self.appointments_df['appointment_id'] == appointment_id
         
         if not appointment_mask.any():
@@ -182,6 +283,11 @@ class PatientAppointmentDB:
         
         # Update status to cancelled
         self.appointments_df.loc[appointment_mask, 'status'] = 'cancelled'
+        self._publish('cancelled', {
+            **appointment.to_dict(),
+            'status': 'cancelled',
+            'previous_status': appointment['status']
+        })
         
         # Free up the doctor slot (you'll need to implement this in DocDB)
         # doc.free_doctor_slot(appointment['doctor_id'])
@@ -196,6 +302,10 @@ class PatientAppointmentDB:
     # these are not to be exported, these will be used by the backend services for analytics and not by llm
     def save_to_csv(self, filename: str = "./data/patients.csv"):
         """Save appointments to CSV file."""
+        with self._write_lock:
+            self._save_to_csv(filename)
+
+    def _save_to_csv(self, filename: str = "./data/patients.csv"):
         self.appointments_df.to_csv(filename, index=False)
         print(f"Appointments saved to {filename}")
 
@@ -1,5 +1,5 @@
-// Filter appointments based on selected criteria
-async function filterAppointments() {
+// Query parameters for the selected filter criteria
+function filterParams() {
     const status = document.getElementById('status-filter').value;
     const date = document.getElementById('date-filter').value;
     const doctor = document.getElementById('doctor-filter').value;
@@ -8,6 +8,12 @@ async function filterAppointments() {
     if (status !== 'all') params.append('status', status);
     if (date) params.append('date', date);
     if (doctor) params.append('doctor', doctor);
+    return params;
+}
+
+// Filter appointments based on selected criteria
+async function filterAppointments() {
+    const params = filterParams();
     
     try {
         const response = await fetch(`/appointments/filter?${params}`);
@@ -16,6 +22,8 @@ async function filterAppointments() {
         if (response.ok) {
             updateAppointmentsTable(data.appointments);
             updateAppointmentCount(data.count);
+            refreshStatistics();
+            connectChangeStream(data.version);
         } else {
             console.error('Error filtering appointments:', data.error);
         }
@@ -33,8 +41,13 @@ function updateAppointmentsTable(appointments) {
         return;
     }
     
-    tbody.innerHTML = appointments.map(appointment => `
-        <tr class="appointment-row status-${appointment.status}">
+    tbody.innerHTML = appointments.map(renderAppointmentRow).join('');
+}
+
+// Render one appointment as a table row
+function renderAppointmentRow(appointment) {
+    return `
+        <tr class="appointment-row status-${appointment.status}" data-appointment-id="${appointment.appointment_id}">
             <td>${appointment.appointment_id}</td>
             <td class="patient-name">${appointment.patient_name}</td>
             <td>${appointment.patient_age}</td>
@@ -57,7 +70,7 @@ function updateAppointmentsTable(appointments) {
                 <a href="/appointments/${appointment.appointment_id}" class="view-btn">View</a>
             </td>
         </tr>
-    `).join('');
+    `;
 }
 
 // Update appointment count
@@ -66,6 +79,89 @@ function updateAppointmentCount(count) {
     countElement.textContent = `Total: ${count} appointments`;
 }
 
+// Refresh the summary cards from the maintained aggregates
+async function refreshStatistics() {
+    try {
+        const response = await fetch('/appointments/stats');
+        const stats = await response.json();
+        
+        if (response.ok) {
+            document.getElementById('stat-total').textContent = stats.total;
+            document.getElementById('stat-confirmed').textContent = stats.by_status.confirmed || 0;
+            document.getElementById('stat-cancelled').textContent = stats.by_status.cancelled || 0;
+            document.getElementById('stat-cancellation-rate').textContent = `${(stats.cancellation_rate * 100).toFixed(1)}%`;
+        } else {
+            console.error('Error loading statistics:', stats.error);
+        }
+    } catch (error) {
+        console.error('Error loading statistics:', error);
+    }
+}
+
+// Live updates: apply booking/cancellation deltas pushed by the server
+let changeStream = null;
+let streamVersion = 0;
+let streamId = null;
+
+function connectChangeStream(version) {
+    if (changeStream) changeStream.close();
+    streamVersion = version;
+    // The server matches pushed changes against the same filters as the list
+    const params = filterParams();
+    params.append('since', version);
+    // Lets the server end our previous stream right away and reuse its slot
+    if (streamId) params.append('replaces', streamId);
+    changeStream = new EventSource(`/appointments/stream?${params}`);
+    
+    changeStream.addEventListener('stream', (event) => {
+        streamId = JSON.parse(event.data).stream;
+    });
+    
+    changeStream.addEventListener('change', (event) => {
+        const change = JSON.parse(event.data);
+        streamVersion = change.version;
+        applyAppointmentChange(change.appointment, change.matches);
+        refreshStatisticsSoon();
+    });
+    
+    // The server no longer has our cursor, reload the list once
+    changeStream.addEventListener('reset', () => filterAppointments());
+    
+    // The server closes streams after a while and the browser reconnects by itself,
+    // but a refused connection (too many open streams) is not retried automatically
+    const stream = changeStream;
+    stream.onerror = () => {
+        if (stream.readyState === EventSource.CLOSED && stream === changeStream) {
+            setTimeout(() => {
+                if (stream === changeStream) connectChangeStream(streamVersion);
+            }, 10000);
+        }
+    };
+}
+
+// Insert, update or drop a single row without reloading the table
+function applyAppointmentChange(appointment, matches) {
+    const tbody = document.querySelector('#appointments-table tbody');
+    const existing = tbody.querySelector(`tr[data-appointment-id="${appointment.appointment_id}"]`);
+    const template = document.createElement('template');
+    template.innerHTML = renderAppointmentRow(appointment).trim();
+    const row = template.content.firstChild;
+    
+    if (!matches) {
+        if (existing) existing.remove();
+    } else if (existing) {
+        existing.replaceWith(row);
+    } else {
+        const placeholder = tbody.querySelector('.no-appointments');
+        if (placeholder) placeholder.parentElement.remove();
+        tbody.prepend(row);
+    }
+    
+    updateAppointmentCount(tbody.querySelectorAll('tr[data-appointment-id]').length);
+}
+
+const refreshStatisticsSoon = debounce(refreshStatistics, 500);
+
 // Clear all filters
 function clearFilters() {
     document.getElementById('status-filter').value = 'all';
@@ -80,6 +176,8 @@ document.addEventListener('DOMContentLoaded', function() {
     document.getElementById('status-filter').addEventListener('change', filterAppointments);
     document.getElementById('date-filter').addEventListener('change', filterAppointments);
     document.getElementById('doctor-filter').addEventListener('input', debounce(filterAppointments, 300));
+    
+    connectChangeStream(document.getElementById('appointments-table').dataset.version);
 });
 
 // Debounce function for search input
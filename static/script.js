@@ -58,6 +58,9 @@ async function sendMessage() {
             // Add bot response
             addBotMessage(data.response);
             conversationId = data.conversation_id;
+        } else if (response.status === 503 || response.status === 504) {
+            // Server busy or answer took too long
+            addBotMessage(data.error);
         } else {
             addBotMessage('Sorry, I encountered an error. Please try again.');
         }